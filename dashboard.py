@@ -1,9 +1,16 @@
 import streamlit as st
 import pandas as pd
 import yfinance as yf
-import plotly.express as px
+from yfinance import shared as yf_shared
+from yfinance.exceptions import YFRateLimitError
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from functools import wraps
+from pathlib import Path
+import hashlib
+import os
+import random
+import tempfile
 import time
 import numpy as np
 
@@ -13,21 +20,204 @@ st.set_page_config(
     layout="wide"
 )
 
-@st.cache_data(ttl=3600)
-def fetch_single_stock_data(ticker, start_date, end_date):
+CACHE_DIR = Path(__file__).parent / ".cache"
+CACHE_TTL = 3600
+INCOMPLETE_CACHE_TTL = 300
+MAX_RETRIES = 4
+RATE_LIMIT_MARKERS = ('YFRateLimitError', 'Too Many Requests', '429')
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+def is_rate_limited(error):
+    if isinstance(error, YFRateLimitError):
+        return True
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) == 429
+
+def backoff(attempt):
+    time.sleep(2 ** attempt * 0.25 + random.uniform(0, 0.25))
+
+def retry_on_rate_limit(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(MAX_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                backoff(attempt)
+        return func(*args, **kwargs)
+    return wrapper
+
+def cache_path(ticker, start_date, end_date):
+    key = hashlib.md5(f"{ticker}|{start_date.isoformat()}|{end_date.isoformat()}".encode()).hexdigest()
+    return CACHE_DIR / ticker / f"{key}.pkl"
+
+def is_expired(path):
+    return time.time() - path.stat().st_mtime >= CACHE_TTL
+
+def read_cached(path):
     try:
-        time.sleep(0.5)
-        stock = yf.Ticker(ticker)
-        data = stock.history(start=start_date, end=end_date)
-        return data
-    except Exception as e:
-        st.error(f"Error fetching {ticker}: {e}")
+        if is_expired(path):
+            return None
+        return pd.read_pickle(path)
+    except FileNotFoundError:
         return None
+    except Exception:
+        path.unlink(missing_ok=True)
+        return None
+
+def write_cached(path, data):
+    tmp_path = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        os.close(fd)
+        data.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if tmp_path is not None:
+            Path(tmp_path).unlink(missing_ok=True)
+
+def prune_cache():
+    for path in CACHE_DIR.glob('*/*'):
+        try:
+            if is_expired(path):
+                path.unlink()
+        except OSError:
+            pass
+
+def missing_tickers(data, tickers):
+    fetched = data.columns.get_level_values(0)
+    return [t for t in tickers if t not in fetched or data[t].isna().all().all()]
+
+def rate_limited_tickers(tickers):
+    errors = getattr(yf_shared, '_ERRORS', {})
+    return [
+        t for t in tickers
+        if any(marker in str(errors.get(t.upper(), '')) for marker in RATE_LIMIT_MARKERS)
+    ]
+
+def download_prices(tickers, start_date, end_date):
+    # yf.download swallows per-ticker errors (including rate limits) and records
+    # them in yf.shared._ERRORS, so retry only the tickers it says were throttled.
+    # A ticker that is simply empty for the range is final.
+    frames = []
+    pending = list(tickers)
+    for attempt in range(MAX_RETRIES + 1):
+        data = yf.download(
+            pending,
+            start=start_date,
+            end=end_date,
+            group_by='ticker',
+            threads=True,
+            progress=False,
+            auto_adjust=False
+        )
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([pending, data.columns])
+        missing = missing_tickers(data, pending)
+        fetched = [t for t in pending if t not in missing]
+        if fetched:
+            frames.append(data[fetched])
+        pending = rate_limited_tickers(missing)
+        if not pending or attempt == MAX_RETRIES:
+            break
+        backoff(attempt)
+    return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+def fetch_bulk(tickers, start_date, end_date):
+    stock_frames = {}
+    for ticker in tickers:
+        data = read_cached(cache_path(ticker, start_date, end_date))
+        if data is not None:
+            stock_frames[ticker] = data
+    
+    pending = [t for t in tickers if t not in stock_frames]
+    if pending:
+        prune_cache()
+        try:
+            data = download_prices(pending, start_date, end_date)
+        except Exception as e:
+            st.error(f"Error fetching {', '.join(pending)}: {e}")
+            data = pd.DataFrame()
+        for ticker in pending:
+            if data.empty or ticker not in data.columns.get_level_values(0):
+                continue
+            stock_data = data[ticker]
+            stock_data = stock_data[[c for c in PRICE_COLUMNS if c in stock_data.columns]].dropna(how='all')
+            write_cached(cache_path(ticker, start_date, end_date), stock_data)
+            stock_frames[ticker] = stock_data
+    
+    return stock_frames
+
+def downcast_prices(data):
+    data = data.copy()
+    price_columns = [c for c in PRICE_COLUMNS if c in data.columns and c != 'Volume']
+    data[price_columns] = data[price_columns].astype(np.float32)
+    if 'Volume' in data.columns:
+        data['Volume'] = pd.to_numeric(data['Volume'], downcast='unsigned')
+    return data
+
+def get_series(tickers, price_type, start_date, end_date):
+    stock_frames = fetch_bulk(tuple(sorted(tickers)), start_date, end_date)
+    series_list = []
+    
+    for stock in tickers:
+        if stock not in stock_frames:
+            continue
+        series = stock_frames[stock][price_type].dropna()
+        if not series.empty:
+            series_list.append(series.rename(stock))
+    
+    if not series_list:
+        return pd.DataFrame()
+    plot_data = pd.concat(series_list, axis=1)
+    if price_type != 'Volume':
+        plot_data = plot_data.astype(np.float32)
+    return plot_data
+
+def get_ohlc(ticker, start_date, end_date):
+    stock_frames = fetch_bulk((ticker,), start_date, end_date)
+    if ticker not in stock_frames:
+        return pd.DataFrame()
+    return downcast_prices(stock_frames[ticker][OHLC_COLUMNS])
+
+@st.cache_data(ttl=24 * 3600)
+@retry_on_rate_limit
+def get_info(ticker):
+    return yf.Ticker(ticker).info
+
+@st.cache_data(ttl=3600)
+def build_comparison_chart(plot_data, chart_type, price_type):
+    fig = go.Figure()
+    for stock in plot_data.columns:
+        fig.add_trace(go.Scattergl(
+            x=plot_data.index,
+            y=plot_data[stock].values,
+            mode='lines',
+            name=stock,
+            fill='tozeroy' if chart_type == "Area Chart" else None
+        ))
+    fig.update_layout(
+        title=f"{price_type} Prices",
+        xaxis_title="Date",
+        yaxis_title=f"Price ($)" if price_type != "Volume" else "Volume",
+        legend_title="Stocks"
+    )
+    return fig.to_dict()
 
 def format_number(num):
-    if num is None or num == 'N/A' or pd.isna(num):
+    if num is None or num == 'N/A':
+        return 'N/A'
+    try:
+        num = float(num)
+    except (TypeError, ValueError):
+        return 'N/A'
+    if num != num:
         return 'N/A'
-    return "{:,}".format(float(num))
+    return f"{num:,.0f}"
 
 def main():
     st.title("📈 Stock Market Dashboard")
@@ -65,20 +255,26 @@ def main():
     )
     
     if selected_stocks:
-        all_stock_data = {}
-        plot_data = pd.DataFrame()
-        
-        progress_bar = st.progress(0)
+        cache_key = (tuple(selected_stocks), start_date, end_date, price_type)
+        if (st.session_state.get('data_key') == cache_key
+                and time.time() < st.session_state.get('data_expires', 0)):
+            plot_data = st.session_state['plot_data']
+        else:
+            with st.spinner(f"Fetching data for {', '.join(selected_stocks)}..."):
+                plot_data = get_series(tuple(selected_stocks), price_type, start_date, end_date)
+            complete = set(plot_data.columns) == set(selected_stocks)
+            st.session_state['data_key'] = cache_key
+            st.session_state['data_expires'] = time.time() + (CACHE_TTL if complete else INCOMPLETE_CACHE_TTL)
+            st.session_state['plot_data'] = plot_data
         
-        for i, stock in enumerate(selected_stocks):
-            with st.spinner(f'Fetching data for {stock}...'):
-                stock_data = fetch_single_stock_data(stock, start_date, end_date)
-                if stock_data is not None and not stock_data.empty:
-                    all_stock_data[stock] = stock_data
-                    plot_data[stock] = stock_data[price_type]
-                progress_bar.progress((i + 1) / len(selected_stocks))
+        available_stocks = [s for s in selected_stocks if s in plot_data.columns]
         
-        progress_bar.empty()
+        candlestick_stock = None
+        if chart_type == "Candlestick" and available_stocks:
+            candlestick_stock = st.sidebar.selectbox(
+                "Select a stock for candlestick view",
+                options=available_stocks
+            )
         
         if plot_data.empty:
             st.error("Could not retrieve data for any of the selected stocks.")
@@ -87,65 +283,37 @@ def main():
             
             cols = st.columns(len(selected_stocks))
             
+            current_prices = plot_data.ffill().iloc[-1]
+            pct_changes = plot_data.pct_change(fill_method=None).ffill().iloc[-1] * 100
+            if len(plot_data) < 2:
+                pct_changes = pct_changes.fillna(0)
+            delta_colors = pd.Series(
+                np.where(pct_changes > 0, "off", np.where(pct_changes < 0, "inverse", "normal")),
+                index=pct_changes.index
+            )
+            
             for i, stock in enumerate(selected_stocks):
                 if stock in plot_data.columns:
-                    try:
-                        current_price = plot_data[stock].iloc[-1]
-                        previous_price = plot_data[stock].iloc[-2]
-                        
-                        pct_change = ((current_price - previous_price) / previous_price) * 100
-                        
-                        delta_color = "normal"
-                        if pct_change > 0:
-                            delta_color = "off"
-                        elif pct_change < 0:
-                            delta_color = "inverse"
-                            
-                        cols[i].metric(
-                            f"{stock}",
-                            f"${current_price:.2f}",
-                            f"{pct_change:.2f}%",
-                            delta_color=delta_color
-                        )
-                    except Exception as e:
-                        cols[i].error(f"Error: {e}")
+                    cols[i].metric(
+                        f"{stock}",
+                        f"${current_prices[stock]:.2f}",
+                        f"{pct_changes[stock]:.2f}%" if pd.notna(pct_changes[stock]) else None,
+                        delta_color=delta_colors[stock]
+                    )
                 else:
                     cols[i].error(f"No data for {stock}")
             
             st.subheader(f"Stock Price Comparison ({price_type})")
             
             try:
-                if chart_type == "Line Chart":
-                    fig = px.line(
-                        plot_data, 
-                        title=f"{price_type} Prices"
-                    )
-                    fig.update_layout(
-                        xaxis_title="Date",
-                        yaxis_title=f"Price ($)" if price_type != "Volume" else "Volume",
-                        legend_title="Stocks"
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                elif chart_type == "Area Chart":
-                    fig = px.area(
-                        plot_data, 
-                        title=f"{price_type} Prices"
-                    )
-                    fig.update_layout(
-                        xaxis_title="Date",
-                        yaxis_title=f"Price ($)" if price_type != "Volume" else "Volume",
-                        legend_title="Stocks"
-                    )
+                if chart_type in ("Line Chart", "Area Chart"):
+                    fig = go.Figure(build_comparison_chart(plot_data, chart_type, price_type))
                     st.plotly_chart(fig, use_container_width=True)
                 
                 elif chart_type == "Candlestick":
-                    available_stocks = [s for s in selected_stocks if s in all_stock_data]
-                    if available_stocks:
-                        selected_stock = st.selectbox("Select a stock for candlestick view", available_stocks)
-                        
+                    stock_data = get_ohlc(candlestick_stock, start_date, end_date)
+                    if not stock_data.empty:
                         fig = go.Figure()
-                        stock_data = all_stock_data[selected_stock]
                         
                         fig.add_trace(go.Candlestick(
                             x=stock_data.index,
@@ -153,11 +321,11 @@ def main():
                             high=stock_data['High'],
                             low=stock_data['Low'],
                             close=stock_data['Close'],
-                            name=selected_stock
+                            name=candlestick_stock
                         ))
                         
                         fig.update_layout(
-                            title=f"{selected_stock} Candlestick Chart",
+                            title=f"{candlestick_stock} Candlestick Chart",
                             xaxis_title="Date",
                             yaxis_title="Price ($)",
                             xaxis_rangeslider_visible=False
@@ -176,20 +344,15 @@ def main():
                     
                     performance_df = pd.DataFrame({
                         'Stock': performance.index,
-                        'Start Price': start_prices.values,
-                        'End Price': end_prices.values,
-                        'Change (%)': performance.values
+                        'Start Price': start_prices.map('${:.2f}'.format).values,
+                        'End Price': end_prices.map('${:.2f}'.format).values,
+                        'Change (%)': performance.map('{:.2f}%'.format).values
                     })
                     
-                    performance_df['Start Price'] = performance_df['Start Price'].apply(lambda x: f"${x:.2f}")
-                    performance_df['End Price'] = performance_df['End Price'].apply(lambda x: f"${x:.2f}")
-                    performance_df['Change (%)'] = performance_df['Change (%)'].apply(lambda x: f"{x:.2f}%")
-                    
                     st.dataframe(performance_df, use_container_width=True)
                 
                 st.subheader("Detailed Stock Information")
                 
-                available_stocks = [s for s in selected_stocks if s in all_stock_data]
                 if available_stocks:
                     selected_detail_stock = st.selectbox(
                         "Select a stock to view detailed information",
@@ -198,7 +361,7 @@ def main():
                     
                     with st.spinner(f"Fetching details for {selected_detail_stock}..."):
                         try:
-                            stock_info = yf.Ticker(selected_detail_stock).info
+                            stock_info = get_info(selected_detail_stock)
                             
                             col1, col2, col3 = st.columns(3)
                             